@@ -4,18 +4,31 @@ import ebooklib
 import json
 import logging
 import os
+import queue
+import re
+import sqlite3
+import struct
 import sys
+import threading
 import time
+import unicodedata
 import uuid
-import urllib.error
-import urllib.request
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from dataclasses import dataclass
 from ebooklib import epub
-from bs4 import BeautifulSoup
+import httpx
+from bs4 import BeautifulSoup, CData, NavigableString, UnicodeDammit
+from lxml import etree
 import db
 
 # Initialize Spacy
-_NLP = None
+_NLP_PIPELINES = {}
 logger = logging.getLogger(__name__)
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "book_chunks")
 _RAW_QDRANT_VECTOR_DIM = os.getenv("QDRANT_VECTOR_DIM")
@@ -30,6 +43,85 @@ _RAW_TEI_BATCH_SIZE = os.getenv("TEI_BATCH_SIZE")
 TEI_BATCH_SIZE = int(_RAW_TEI_BATCH_SIZE) if _RAW_TEI_BATCH_SIZE else 8
 _RAW_TEI_TIMEOUT = os.getenv("TEI_TIMEOUT")
 TEI_TIMEOUT = float(_RAW_TEI_TIMEOUT) if _RAW_TEI_TIMEOUT else 30.0
+_RAW_TEI_MAX_CONCURRENCY = os.getenv("TEI_MAX_CONCURRENCY")
+TEI_MAX_CONCURRENCY = int(_RAW_TEI_MAX_CONCURRENCY) if _RAW_TEI_MAX_CONCURRENCY else 4
+TEI_ADAPTIVE_BATCHING = os.getenv("TEI_ADAPTIVE_BATCHING", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+_RAW_TEI_MIN_BATCH_SIZE = os.getenv("TEI_MIN_BATCH_SIZE")
+TEI_MIN_BATCH_SIZE = int(_RAW_TEI_MIN_BATCH_SIZE) if _RAW_TEI_MIN_BATCH_SIZE else 1
+_RAW_TEI_MAX_BATCH_SIZE = os.getenv("TEI_MAX_BATCH_SIZE")
+TEI_MAX_BATCH_SIZE = int(_RAW_TEI_MAX_BATCH_SIZE) if _RAW_TEI_MAX_BATCH_SIZE else 32
+_RAW_TEI_MAX_BATCH_CHARS = os.getenv("TEI_MAX_BATCH_CHARS")
+TEI_MAX_BATCH_CHARS = (
+    int(_RAW_TEI_MAX_BATCH_CHARS) if _RAW_TEI_MAX_BATCH_CHARS else 32768
+)
+_RAW_TEI_TARGET_BATCH_SECONDS = os.getenv("TEI_TARGET_BATCH_SECONDS")
+TEI_TARGET_BATCH_SECONDS = (
+    float(_RAW_TEI_TARGET_BATCH_SECONDS) if _RAW_TEI_TARGET_BATCH_SECONDS else 1.0
+)
+_RAW_PARSE_WORKERS = os.getenv("PARSE_WORKERS")
+PARSE_WORKERS = int(_RAW_PARSE_WORKERS) if _RAW_PARSE_WORKERS else 1
+SPACY_PIPELINE = os.getenv("SPACY_PIPELINE", "full")
+_RAW_SPACY_BATCH_SIZE = os.getenv("SPACY_BATCH_SIZE")
+SPACY_BATCH_SIZE = int(_RAW_SPACY_BATCH_SIZE) if _RAW_SPACY_BATCH_SIZE else 16
+_RAW_SPACY_N_PROCESS = os.getenv("SPACY_N_PROCESS")
+SPACY_N_PROCESS = int(_RAW_SPACY_N_PROCESS) if _RAW_SPACY_N_PROCESS else 1
+
+_RAW_INGEST_MAX_INFLIGHT_CHUNKS = os.getenv("INGEST_MAX_INFLIGHT_CHUNKS")
+INGEST_MAX_INFLIGHT_CHUNKS = (
+    int(_RAW_INGEST_MAX_INFLIGHT_CHUNKS) if _RAW_INGEST_MAX_INFLIGHT_CHUNKS else 512
+)
+_RAW_INGEST_EMBED_GROUP_SIZE = os.getenv("INGEST_EMBED_GROUP_SIZE")
+INGEST_EMBED_GROUP_SIZE = (
+    int(_RAW_INGEST_EMBED_GROUP_SIZE) if _RAW_INGEST_EMBED_GROUP_SIZE else 64
+)
+_RAW_INGEST_QUEUE_SIZE = os.getenv("INGEST_QUEUE_SIZE")
+INGEST_QUEUE_SIZE = int(_RAW_INGEST_QUEUE_SIZE) if _RAW_INGEST_QUEUE_SIZE else 4
+_PIPELINE_POLL_SECONDS = 0.1
+_RAW_QDRANT_UPSERT_BATCH_SIZE = os.getenv("QDRANT_UPSERT_BATCH_SIZE")
+QDRANT_UPSERT_BATCH_SIZE = (
+    int(_RAW_QDRANT_UPSERT_BATCH_SIZE) if _RAW_QDRANT_UPSERT_BATCH_SIZE else 128
+)
+_RAW_QDRANT_UPSERT_PARALLELISM = os.getenv("QDRANT_UPSERT_PARALLELISM")
+QDRANT_UPSERT_PARALLELISM = (
+    int(_RAW_QDRANT_UPSERT_PARALLELISM) if _RAW_QDRANT_UPSERT_PARALLELISM else 2
+)
+QDRANT_UPSERT_WAIT = os.getenv("QDRANT_UPSERT_WAIT", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INGEST_BACKGROUND_CLEANUP = os.getenv("INGEST_BACKGROUND_CLEANUP", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+_RAW_EMBEDDING_CACHE_MAX_MB = os.getenv("EMBEDDING_CACHE_MAX_MB")
+EMBEDDING_CACHE_MAX_MB = (
+    float(_RAW_EMBEDDING_CACHE_MAX_MB) if _RAW_EMBEDDING_CACHE_MAX_MB else 512.0
+)
+# struct format codes for the cached vector encodings.
+EMBEDDING_CACHE_DTYPES = {"float16": "e", "float32": "f"}
+
+SPACY_PIPELINES = ("full", "sentences")
+# Components that contribute to doc.sents; everything else is disabled in the
+# "sentences" pipeline.
+SENTENCE_COMPONENTS = ("tok2vec", "parser", "senter", "sentencizer")
+
+_PARSE_POOLS = {}
+_PARSE_POOL_LOCK = threading.Lock()
+_TEI_CLIENTS = {}
+_TEI_CLIENT_LOCK = threading.Lock()
+_EMBEDDING_CACHES = {}
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+_CLEANUP_EXECUTOR = None
+_CLEANUP_LOCK = threading.Lock()
 
 INGESTION_STAGES = (
     ("hashing", "Hashing...", 5),
@@ -68,7 +160,8 @@ def _get_metrics_logger():
         metrics_logger.addHandler(handler)
     else:
         for handler in metrics_logger.handlers:
-            if isinstance(handler, logging.StreamHandler):
+            # Only retarget our own handler, not subclasses added by test runners.
+            if type(handler) is logging.StreamHandler:
                 handler.stream = sys.stdout
     metrics_logger.setLevel(logging.DEBUG)
     metrics_logger.propagate = False
@@ -103,32 +196,307 @@ def get_file_hash(filepath):
     return sha256_hash.hexdigest()
 
 
+BLOCK_TAGS = ("p", "div", "h1", "h2", "h3", "h4", "br")
+# Mirrors BeautifulSoup's html.parser builder: strings inside these tags are not
+# part of get_text(), and whitespace inside the preserve tags is kept verbatim.
+_NON_TEXT_TAGS = frozenset(("rt", "rp", "style", "script", "template"))
+# html.parser treats the content of these tags as raw text, never as elements.
+_RAW_TEXT_TAGS = frozenset(("style", "script"))
+_PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "textarea"))
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_XML_PROLOG_TOKEN = re.compile(
+    r"[\x20\x0a\x09\x0c\x0d]+|<\?.*?\?>|<!--.*?-->|<!DOCTYPE(?:[^>\[]|\[.*?\])*>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
 def clean_html(html_content):
     """Extract text from HTML content."""
     soup = BeautifulSoup(html_content, "html.parser")
     # Add space after block elements to prevent merging words
-    for block in soup.find_all(["p", "div", "h1", "h2", "h3", "h4", "br"]):
+    for block in soup.find_all(BLOCK_TAGS):
         block.append(" ")
     return soup.get_text()
 
 
-def get_nlp():
-    global _NLP
-    if _NLP is None:
+@dataclass(frozen=True)
+class HtmlExtraction:
+    text: str
+    title: str | None
+    blocks: list[tuple[int, int]]
+
+
+def _collapse_whitespace_string(value):
+    if not value or value.strip(_ASCII_SPACES):
+        return value
+    return "\n" if "\n" in value else " "
+
+
+class _RawTextMarkupError(Exception):
+    """Raised when XML markup nests elements inside <script> or <style>."""
+
+
+class _HtmlTextTarget:
+    """Parser target that rebuilds clean_html() text and the first <h1> title.
+
+    It is fed start/end/data events (from lxml or a BeautifulSoup tree walk)
+    and reproduces BeautifulSoup's string handling: whitespace-only strings
+    collapse to a newline or space, script/style text is dropped, and every
+    block element ends with an extra space.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._length = 0
+        self._pending = []
+        self._depth = 0
+        self._non_text_depth = 0
+        self._raw_text_depth = 0
+        self._preserve_depth = 0
+        self._block_starts = []
+        self._title_parts = None
+        self._title_depth = None
+        self.title = None
+        self.blocks = []
+
+    @staticmethod
+    def _local_name(tag):
+        if not isinstance(tag, str):
+            return ""
+        if tag.startswith("{"):
+            tag = tag.rpartition("}")[2]
+        return tag.lower()
+
+    def _emit(self, value, collapse=True):
+        if collapse and not self._preserve_depth:
+            value = _collapse_whitespace_string(value)
+        if self._non_text_depth:
+            return
+        self._parts.append(value)
+        self._length += len(value)
+        if self._title_parts is not None:
+            self._title_parts.append(value)
+
+    def _flush(self):
+        if self._pending:
+            value = "".join(self._pending)
+            self._pending = []
+            self._emit(value)
+
+    def _append_block_space(self):
+        # Matches the NavigableString that clean_html() appends to each block.
+        self._parts.append(" ")
+        self._length += 1
+
+    def string(self, value):
+        """Add an already-collapsed string from a parsed BeautifulSoup tree."""
+        self._flush()
+        self._emit(value, collapse=False)
+
+    def start(self, tag, _attrib=None, _nsmap=None):
+        self._flush()
+        name = self._local_name(tag)
+        if self._raw_text_depth:
+            raise _RawTextMarkupError(name)
+        self._depth += 1
+        if name in _RAW_TEXT_TAGS:
+            self._raw_text_depth += 1
+        if name in _NON_TEXT_TAGS:
+            self._non_text_depth += 1
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        if name == "h1" and self.title is None and self._title_parts is None:
+            self._title_parts = []
+            self._title_depth = self._depth
+        self._block_starts.append((name, self._length if name in BLOCK_TAGS else None))
+
+    def end(self, _tag):
+        self._flush()
+        name, block_start = self._block_starts.pop()
+        if block_start is not None:
+            self._append_block_space()
+            self.blocks.append((block_start, self._length))
+        if self._title_depth == self._depth:
+            self.title = "".join(self._title_parts).strip()
+            self._title_parts = None
+            self._title_depth = None
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+        if name in _NON_TEXT_TAGS:
+            self._non_text_depth -= 1
+        if name in _RAW_TEXT_TAGS:
+            self._raw_text_depth -= 1
+        self._depth -= 1
+
+    def data(self, value):
+        self._pending.append(value)
+
+    def comment(self, _text):
+        self._flush()
+
+    def pi(self, _target, _data=None):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        # Blocks close inner-first; report them in document (start tag) order.
+        self.blocks.sort(key=lambda block: (block[0], -block[1]))
+        return HtmlExtraction("".join(self._parts), self.title, self.blocks)
+
+
+def _decode_html(raw_content):
+    if isinstance(raw_content, str):
+        return raw_content
+    # Same decoding BeautifulSoup applies, so both paths see identical text.
+    return UnicodeDammit(raw_content, is_html=True).unicode_markup
+
+
+def _split_xml_prolog(markup):
+    """Return (prolog whitespace strings, root offset) or None for non-XML input."""
+    strings = []
+    position = 0
+    while True:
+        match = _XML_PROLOG_TOKEN.match(markup, position)
+        if not match:
+            break
+        token = match.group(0)
+        if token[0] != "<":
+            strings.append(token)
+        elif "<!ENTITY" in token.upper():
+            return None
+        position = match.end()
+    if not markup.startswith("<", position):
+        return None
+    return strings, position
+
+
+def _split_xml_epilog(markup, root_offset):
+    strings = []
+    end = len(markup)
+    while end > root_offset:
+        stripped = len(markup[:end].rstrip(_ASCII_SPACES))
+        if stripped < end:
+            strings.append(markup[stripped:end])
+            end = stripped
+        elif markup.endswith("-->", root_offset, end):
+            end = markup.rfind("<!--", root_offset, end)
+        elif markup.endswith("?>", root_offset, end):
+            end = markup.rfind("<?", root_offset, end)
+        else:
+            break
+        if end < root_offset:
+            return []
+    strings.reverse()
+    return strings
+
+
+def _extract_html_xml(markup):
+    # XML normalizes carriage returns and merges CDATA into text, which
+    # html.parser does not; those documents use the BeautifulSoup path.
+    if "\r" in markup or "<![CDATA[" in markup:
+        return None
+    prolog = _split_xml_prolog(markup)
+    if prolog is None:
+        return None
+    prolog_strings, root_offset = prolog
+
+    target = _HtmlTextTarget()
+    for value in prolog_strings:
+        target.string(_collapse_whitespace_string(value))
+    parser = etree.XMLParser(target=target, huge_tree=True, resolve_entities=False)
+    try:
+        parser.feed(markup[root_offset:])
+        parser.close()
+    except (etree.XMLSyntaxError, _RawTextMarkupError):
+        return None
+    for value in _split_xml_epilog(markup, root_offset):
+        target.string(_collapse_whitespace_string(value))
+    return target.close()
+
+
+def _extract_html_soup(markup):
+    target = _HtmlTextTarget()
+    soup = BeautifulSoup(markup, "html.parser")
+    stack = [(node, False) for node in reversed(soup.contents)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            target.end(node.name)
+        elif type(node) in (NavigableString, CData):
+            target.string(str(node))
+        elif node.name is not None and not isinstance(node, NavigableString):
+            target.start(node.name)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.contents))
+    return target.close()
+
+
+def extract_html(raw_content):
+    """Extract clean_html() text, the first <h1> title and block offsets in one parse.
+
+    Well-formed XHTML is streamed through lxml's XML parser without building a
+    tree; anything else is parsed once with BeautifulSoup. Both paths produce
+    exactly the text of ``clean_html`` and the title of
+    ``extract_chapter_title``. ``blocks`` holds (start, end) character offsets
+    of each block element in ``text``.
+    """
+    markup = _decode_html(raw_content)
+    extraction = _extract_html_xml(markup)
+    if extraction is None:
+        extraction = _extract_html_soup(markup)
+    return extraction
+
+
+def _resolve_spacy_pipeline(pipeline):
+    if pipeline is None:
+        pipeline = SPACY_PIPELINE
+    if pipeline not in SPACY_PIPELINES:
+        raise ValueError(
+            f"SPACY_PIPELINE must be one of {', '.join(SPACY_PIPELINES)}; "
+            f"got '{pipeline}'."
+        )
+    return pipeline
+
+
+def get_nlp(pipeline=None):
+    """Return the cached spaCy pipeline for ``pipeline`` ("full" or "sentences")."""
+    pipeline = _resolve_spacy_pipeline(pipeline)
+    nlp = _NLP_PIPELINES.get(pipeline)
+    if nlp is None:
         try:
-            _NLP = spacy.load("en_core_web_sm")
+            nlp = spacy.load("en_core_web_sm")
         except OSError:
-            _NLP = spacy.blank("en")
-            if "sentencizer" not in _NLP.pipe_names:
-                _NLP.add_pipe("sentencizer")
-    return _NLP
+            nlp = spacy.blank("en")
+            if "sentencizer" not in nlp.pipe_names:
+                nlp.add_pipe("sentencizer")
+        if pipeline == "sentences":
+            disabled = [
+                name for name in nlp.pipe_names if name not in SENTENCE_COMPONENTS
+            ]
+            if disabled:
+                nlp.select_pipes(disable=disabled)
+        _NLP_PIPELINES[pipeline] = nlp
+    return nlp
+
+
+def _doc_sentences(doc):
+    # Filter out very short or empty sentences
+    return [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 5]
 
 
-def extract_sentences(text):
+def extract_sentences(text, pipeline=None):
     """Split text into sentences using Spacy."""
-    doc = get_nlp()(text)
-    # Filter out very short or empty sentences
-    return [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 5]
+    return _doc_sentences(get_nlp(pipeline)(text))
+
+
+def extract_sentences_batch(texts, pipeline=None, batch_size=None, n_process=None):
+    """Split many texts into sentences with ``nlp.pipe``; one list per text."""
+    if batch_size is None:
+        batch_size = SPACY_BATCH_SIZE
+    if n_process is None:
+        n_process = SPACY_N_PROCESS
+    docs = get_nlp(pipeline).pipe(texts, batch_size=batch_size, n_process=n_process)
+    return [_doc_sentences(doc) for doc in docs]
 
 
 @dataclass(frozen=True)
@@ -145,12 +513,18 @@ class Chunk:
     sentences: list[str]
 
 
-def extract_chapter_title(raw_content, chapter_index):
-    chapter_title = f"Chapter {chapter_index + 1}"
+def _find_h1_title(raw_content):
     soup = BeautifulSoup(raw_content, "html.parser")
     h1 = soup.find("h1")
     if h1:
-        chapter_title = h1.get_text().strip()
+        return h1.get_text().strip()
+    return None
+
+
+def extract_chapter_title(raw_content, chapter_index):
+    chapter_title = _find_h1_title(raw_content)
+    if chapter_title is None:
+        chapter_title = f"Chapter {chapter_index + 1}"
     return chapter_title
 
 
@@ -162,28 +536,121 @@ def is_spine_document(item):
     return True
 
 
-def build_sentence_stream(book, progress_callback=None):
-    """Return ordered sentence stream and chapter ranges for deterministic indexing."""
-    stream = []
-    chapters = []
-    seq_id = 0
-    chapter_index = 0
+def _parse_spine_document(raw_content):
+    """Return (sentences, h1 title or None) for one spine document."""
+    extraction = extract_html(raw_content)
+    sentences = extract_sentences(extraction.text)
+    if not sentences:
+        return sentences, None
+    return sentences, extraction.title
 
-    chapter_sentences = []
+
+def _init_parse_worker():
+    # Load spaCy once per worker process instead of once per document.
+    get_nlp()
+
+
+def _get_parse_pool(workers):
+    # Pools are kept warm across books so workers only load spaCy once.
+    with _PARSE_POOL_LOCK:
+        pool = _PARSE_POOLS.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_parse_worker
+            )
+            _PARSE_POOLS[workers] = pool
+        return pool
+
+
+def shutdown_parse_pools():
+    with _PARSE_POOL_LOCK:
+        pools = list(_PARSE_POOLS.values())
+        _PARSE_POOLS.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def _resolve_parse_workers(workers):
+    if workers is None:
+        workers = PARSE_WORKERS
+    if workers <= 0:
+        raise ValueError("PARSE_WORKERS must be a positive integer.")
+    return workers
+
+
+def _iter_spine_contents(book):
     for item_id, _linear in book.spine:
         item = book.get_item_with_id(item_id)
+        if is_spine_document(item):
+            yield item.get_content()
 
-        if not is_spine_document(item):
-            continue
 
-        raw_content = item.get_content()
-        text = clean_html(raw_content)
-        sentences = extract_sentences(text)
+def _pipe_spine_documents(book):
+    extractions = (
+        (extraction.text, extraction.title)
+        for extraction in map(extract_html, _iter_spine_contents(book))
+    )
+    docs = get_nlp("sentences").pipe(
+        extractions,
+        as_tuples=True,
+        batch_size=SPACY_BATCH_SIZE,
+        n_process=SPACY_N_PROCESS,
+    )
+    for doc, title in docs:
+        sentences = _doc_sentences(doc)
+        yield sentences, title if sentences else None
+
+
+def _iter_parsed_spine_documents(book, workers=1):
+    """Yield (sentences, h1 title) per spine document, in spine order.
+
+    With more than one worker, documents are parsed in a process pool while a
+    bounded window of results is kept in flight, so ordering stays identical
+    to the serial path. The single-process "sentences" pipeline batches
+    documents through ``nlp.pipe`` instead.
+    """
+    if workers <= 1:
+        if _resolve_spacy_pipeline(None) == "sentences":
+            yield from _pipe_spine_documents(book)
+            return
+        for raw_content in _iter_spine_contents(book):
+            yield _parse_spine_document(raw_content)
+        return
+
+    pool = _get_parse_pool(workers)
+    pending = deque()
+    try:
+        for raw_content in _iter_spine_contents(book):
+            pending.append(pool.submit(_parse_spine_document, raw_content))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def build_sentence_stream(book, progress_callback=None, workers=None):
+    """Return ordered sentence stream and chapter ranges for deterministic indexing.
+
+    ``workers`` controls how many processes parse spine documents; it defaults
+    to ``PARSE_WORKERS`` and 1 keeps parsing in the current process.
+    """
+    workers = _resolve_parse_workers(workers)
+    stream = []
+    chapters = []
+    seq_id = 0
+    chapter_index = 0
 
+    chapter_sentences = []
+    for sentences, h1_title in _iter_parsed_spine_documents(book, workers):
         if not sentences:
             continue
 
-        chapter_title = extract_chapter_title(raw_content, chapter_index)
+        chapter_title = h1_title
+        if chapter_title is None:
+            chapter_title = f"Chapter {chapter_index + 1}"
         chapter_sentences.append((chapter_index, chapter_title, sentences))
         chapter_index += 1
 
@@ -273,19 +740,31 @@ def build_chunk_payloads(book_id, stream, chunks):
     for chunk in chunks:
         start_item = stream[chunk.pos_start]
         end_item = stream[chunk.pos_end]
-        payloads.append(
-            {
-                "book_id": book_id,
-                "chapter_index": start_item.chapter_index,
-                "pos_start": start_item.seq_id,
-                "pos_end": end_item.seq_id,
-                "sentences": list(chunk.sentences),
-                "text": " ".join(chunk.sentences),
-            }
-        )
+        payload = {
+            "book_id": book_id,
+            "chapter_index": start_item.chapter_index,
+            "pos_start": start_item.seq_id,
+            "pos_end": end_item.seq_id,
+            "sentences": list(chunk.sentences),
+            "text": " ".join(chunk.sentences),
+        }
+        payload["content_hash"] = _chunk_content_hash(payload)
+        payloads.append(payload)
     return payloads
 
 
+def _chunk_content_hash(payload):
+    """Hash every payload field so re-ingest can tell unchanged chunks apart."""
+    content = {key: value for key, value in payload.items() if key != "content_hash"}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _chunk_point_id(book_id, pos_start):
+    # Use deterministic UUIDs to satisfy Qdrant's point ID requirements.
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"{book_id}:{pos_start}")
+
+
 def _hash_embedding(text, dim):
     """Deterministic fallback embedding derived from full text."""
     if dim <= 0:
@@ -309,46 +788,197 @@ def _hash_embedding(text, dim):
     return values
 
 
-def _tei_embed(texts, base_url=None, batch_size=None, progress_callback=None):
-    if base_url is None:
-        base_url = TEI_BASE_URL
-    if isinstance(texts, str):
-        texts = [texts]
+def _estimate_tokens(text):
+    # Roughly four characters per token for English WordPiece/BPE vocabularies.
+    return max(1, (len(text) + 3) // 4)
 
-    if not texts:
-        return []
 
-    if batch_size is None:
-        batch_size = TEI_BATCH_SIZE
-    if batch_size is not None and batch_size <= 0:
-        raise ValueError("TEI_BATCH_SIZE must be a positive integer.")
+class TEIBatchRejected(RuntimeError):
+    """TEI refused a batch as too large (HTTP 413) or timed out processing it."""
 
-    url = f"{base_url.rstrip('/')}/embed"
-    embeddings = []
-    step = batch_size or len(texts)
-    total = len(texts)
-    total_batches = (total + step - 1) // step
-    processed = 0
-    for batch_index, offset in enumerate(range(0, len(texts), step), start=1):
-        batch = texts[offset : offset + step]
-        payload = {"inputs": batch if len(batch) > 1 else batch[0]}
-        data = json.dumps(payload).encode("utf-8")
-        request = urllib.request.Request(
-            url, data=data, headers={"Content-Type": "application/json"}
+
+class FixedBatchSizer:
+    """Split texts into batches of a constant size."""
+
+    def __init__(self, batch_size):
+        if batch_size <= 0:
+            raise ValueError("TEI_BATCH_SIZE must be a positive integer.")
+        self.batch_size = batch_size
+
+    def next_end(self, texts, offset):
+        return min(len(texts), offset + self.batch_size)
+
+    def estimate_batches(self, remaining):
+        return -(-remaining // self.batch_size)
+
+    def record(self, count, chars, seconds):
+        return None
+
+    def reject(self, count, chars):
+        return False
+
+
+class AdaptiveBatchSizer:
+    """Tune TEI batch size from observed latency, payload size and rejections.
+
+    Full batches that finish well under ``target_seconds`` grow the batch
+    size; slow batches shrink it in proportion to the overshoot. A 413 or
+    timeout halves both the batch size and the per-request character budget,
+    lowers ``max_size`` below the refused size, and the rejected batch is
+    retried in smaller pieces. All adjustments stay within
+    ``[min_size, max_size]`` and ``max_chars``.
+    """
+
+    def __init__(self, initial_size, min_size, max_size, max_chars, target_seconds):
+        if min_size <= 0:
+            raise ValueError("TEI_MIN_BATCH_SIZE must be a positive integer.")
+        if max_size < min_size:
+            raise ValueError("TEI_MAX_BATCH_SIZE must be at least TEI_MIN_BATCH_SIZE.")
+        if max_chars <= 0:
+            raise ValueError("TEI_MAX_BATCH_CHARS must be a positive integer.")
+        if target_seconds <= 0:
+            raise ValueError("TEI_TARGET_BATCH_SECONDS must be positive.")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_chars = max_chars
+        self.target_seconds = target_seconds
+        self.batch_size = max(min_size, min(max_size, initial_size))
+        self.char_budget = max_chars
+        self._lock = threading.Lock()
+
+    def next_end(self, texts, offset):
+        with self._lock:
+            size = self.batch_size
+            budget = self.char_budget
+        end = offset
+        chars = 0
+        limit = min(len(texts), offset + size)
+        while end < limit:
+            chars += len(texts[end])
+            # Always send at least one text, even if it alone exceeds the budget.
+            if end > offset and chars > budget:
+                break
+            end += 1
+        return end
+
+    def estimate_batches(self, remaining):
+        with self._lock:
+            return -(-remaining // self.batch_size)
+
+    def record(self, count, chars, seconds):
+        with self._lock:
+            if seconds > self.target_seconds * 1.25:
+                scaled = int(count * self.target_seconds / seconds)
+                self.batch_size = max(self.min_size, min(self.batch_size - 1, scaled))
+                self.char_budget = max(1, min(self.char_budget, chars))
+            elif seconds < self.target_seconds * 0.5:
+                # Only batches that used their full allowance say anything about
+                # whether TEI could take more.
+                if count >= self.batch_size:
+                    self.batch_size = min(
+                        self.max_size, self.batch_size + max(1, self.batch_size // 4)
+                    )
+                if chars >= self.char_budget // 2:
+                    self.char_budget = min(
+                        self.max_chars, self.char_budget + max(1, self.char_budget // 4)
+                    )
+
+    def reject(self, count, chars):
+        with self._lock:
+            # Never grow back to a size TEI has already refused.
+            self.max_size = max(self.min_size, min(self.max_size, count - 1))
+            self.batch_size = max(self.min_size, min(self.batch_size, count // 2))
+            self.char_budget = max(1, min(self.char_budget, chars // 2))
+        return count > 1
+
+
+def _record_padding(stats, batch):
+    tokens = [_estimate_tokens(text) for text in batch]
+    stats["tokens_actual"] = stats.get("tokens_actual", 0) + sum(tokens)
+    stats["tokens_padded"] = stats.get("tokens_padded", 0) + len(tokens) * max(tokens)
+
+
+def _default_batch_sizer():
+    if not TEI_ADAPTIVE_BATCHING:
+        return FixedBatchSizer(TEI_BATCH_SIZE)
+    return AdaptiveBatchSizer(
+        TEI_BATCH_SIZE,
+        TEI_MIN_BATCH_SIZE,
+        TEI_MAX_BATCH_SIZE,
+        TEI_MAX_BATCH_CHARS,
+        TEI_TARGET_BATCH_SECONDS,
+    )
+
+
+class TEIClient:
+    """Embedding client for TEI with keep-alive connections and concurrent batches.
+
+    Batches are posted over a shared ``httpx.Client`` connection pool, with at
+    most ``max_concurrency`` requests in flight across all callers. Results are
+    returned in input order regardless of completion order. Unless a fixed
+    ``batch_size`` is requested, batches are cut by the client's shared
+    ``batch_sizer``.
+
+    Texts are sorted by length before batching so each batch holds texts of
+    similar length and TEI pads less; vectors are put back in input order.
+    """
+
+    def __init__(
+        self,
+        base_url=None,
+        max_concurrency=None,
+        timeout=None,
+        transport=None,
+        batch_sizer=None,
+    ):
+        if base_url is None:
+            base_url = TEI_BASE_URL
+        if max_concurrency is None:
+            max_concurrency = TEI_MAX_CONCURRENCY
+        if timeout is None:
+            timeout = TEI_TIMEOUT
+        if max_concurrency <= 0:
+            raise ValueError("TEI_MAX_CONCURRENCY must be a positive integer.")
+        if batch_sizer is None:
+            batch_sizer = _default_batch_sizer()
+
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.batch_sizer = batch_sizer
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            transport=transport,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="tei"
         )
 
+    def _post_batch(self, batch):
+        payload = {"inputs": batch if len(batch) > 1 else batch[0]}
+        start = time.monotonic()
         try:
-            with urllib.request.urlopen(request, timeout=TEI_TIMEOUT) as response:
-                body = response.read()
-        except urllib.error.HTTPError as exc:
-            message = exc.read().decode("utf-8") if exc.fp else ""
-            raise RuntimeError(
-                f"TEI embedding request failed ({exc.code}): {message}"
-            ) from exc
-        except urllib.error.URLError as exc:
+            response = self._http.post("/embed", json=payload)
+        except (httpx.ReadTimeout, httpx.WriteTimeout) as exc:
+            raise TEIBatchRejected("TEI embedding request timed out.") from exc
+        except httpx.TransportError as exc:
             raise RuntimeError("TEI embedding service is unavailable.") from exc
+        seconds = time.monotonic() - start
 
-        result = json.loads(body)
+        if response.is_error:
+            error_type = (
+                TEIBatchRejected if response.status_code == 413 else RuntimeError
+            )
+            raise error_type(
+                f"TEI embedding request failed ({response.status_code}): "
+                f"{response.text}"
+            )
+
+        result = response.json()
         if not isinstance(result, list):
             raise RuntimeError("TEI embedding response is not a list.")
 
@@ -359,13 +989,312 @@ def _tei_embed(texts, base_url=None, batch_size=None, progress_callback=None):
 
         if len(batch_embeddings) != len(batch):
             raise RuntimeError("TEI embedding response length mismatch.")
+        return batch_embeddings, seconds
+
+    def embed(self, texts, batch_size=None, progress_callback=None, stats=None):
+        sizer = FixedBatchSizer(batch_size) if batch_size else self.batch_sizer
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+        texts = [texts[index] for index in order]
+        total = len(texts)
+        results = {}
+        retries = deque()
+        inflight = {}
+        offset = 0
+        completed = 0
+        processed = 0
+
+        try:
+            while offset < total or retries or inflight:
+                # Batches are cut lazily so each one uses the latest sizing.
+                while len(inflight) < self.max_concurrency and (
+                    retries or offset < total
+                ):
+                    if retries:
+                        start, end = retries.popleft()
+                    else:
+                        start, end = offset, sizer.next_end(texts, offset)
+                        offset = end
+                    batch = texts[start:end]
+                    future = self._executor.submit(self._post_batch, batch)
+                    inflight[future] = (start, end, sum(len(text) for text in batch))
+
+                done, _pending = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end, chars = inflight.pop(future)
+                    count = end - start
+                    try:
+                        embeddings, seconds = future.result()
+                    except TEIBatchRejected:
+                        if not sizer.reject(count, chars):
+                            raise
+                        middle = start + count // 2
+                        retries.extend(((start, middle), (middle, end)))
+                        continue
+                    sizer.record(count, chars, seconds)
+                    if stats is not None:
+                        _record_padding(stats, texts[start:end])
+                    results[start] = embeddings
+                    completed += 1
+                    processed += count
+                    if progress_callback:
+                        total_batches = (
+                            completed
+                            + len(inflight)
+                            + len(retries)
+                            + sizer.estimate_batches(total - offset)
+                        )
+                        progress_callback(processed, total, completed, total_batches)
+        finally:
+            for future in inflight:
+                future.cancel()
+
+        ordered = [vector for start in sorted(results) for vector in results[start]]
+        embeddings = [None] * total
+        for index, vector in zip(order, ordered):
+            embeddings[index] = vector
+        return embeddings
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._http.close()
+
+
+def _get_tei_client(base_url=None):
+    if base_url is None:
+        base_url = TEI_BASE_URL
+    with _TEI_CLIENT_LOCK:
+        client = _TEI_CLIENTS.get(base_url)
+        if client is None:
+            client = TEIClient(base_url)
+            _TEI_CLIENTS[base_url] = client
+        return client
+
+
+def shutdown_tei_clients():
+    with _TEI_CLIENT_LOCK:
+        clients = list(_TEI_CLIENTS.values())
+        _TEI_CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+def _tei_embed(
+    texts, base_url=None, batch_size=None, progress_callback=None, stats=None
+):
+    if isinstance(texts, str):
+        texts = [texts]
 
-        embeddings.extend(batch_embeddings)
-        processed += len(batch)
-        if progress_callback:
-            progress_callback(processed, total, batch_index, total_batches)
+    if not texts:
+        return []
 
-    return embeddings
+    if batch_size is not None and batch_size <= 0:
+        raise ValueError("TEI_BATCH_SIZE must be a positive integer.")
+
+    return _get_tei_client(base_url).embed(
+        list(texts), batch_size, progress_callback=progress_callback, stats=stats
+    )
+
+
+def _normalize_embedding_text(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _embedding_text_hash(text):
+    normalized = _normalize_embedding_text(text)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (model, normalized text hash).
+
+    Vectors are stored as packed float16 or float32 blobs. Once the stored
+    bytes exceed ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes, dtype="float32"):
+        if dtype not in EMBEDDING_CACHE_DTYPES:
+            raise ValueError(
+                f"EMBEDDING_CACHE_DTYPE must be one of: "
+                f"{', '.join(EMBEDDING_CACHE_DTYPES)}."
+            )
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dtype TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used "
+            "ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    def _encode(self, vector):
+        code = EMBEDDING_CACHE_DTYPES[self.dtype]
+        return struct.pack(f"<{len(vector)}{code}", *vector)
+
+    @staticmethod
+    def _decode(dtype, dim, blob):
+        return list(struct.unpack(f"<{dim}{EMBEDDING_CACHE_DTYPES[dtype]}", blob))
+
+    def get_many(self, model, text_hashes):
+        """Return cached vectors for ``text_hashes`` and mark them recently used."""
+        found = {}
+        unique = list(dict.fromkeys(text_hashes))
+        if not unique:
+            return found
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for offset in range(0, len(unique), 500):
+                chunk = unique[offset : offset + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dtype, dim, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for text_hash, dtype, dim, blob in rows:
+                    found[text_hash] = self._decode(dtype, dim, blob)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? "
+                    "WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model, items):
+        """Store ``(text_hash, vector)`` pairs, then evict down to the size cap."""
+        now = time.time()
+        rows = [
+            (model, text_hash, self.dtype, len(vector), self._encode(vector), now)
+            for text_hash, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, text_hash, dtype, dim, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for rowid, size in self._conn.execute(
+            "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ):
+            if freed >= excess:
+                break
+            doomed.append((rowid,))
+            freed += size
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", doomed)
+
+    def size_bytes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _resolve_embedding_cache_path():
+    if EMBEDDING_CACHE_PATH is not None:
+        return EMBEDDING_CACHE_PATH
+    # Keep the cache beside the state database so both share one data volume.
+    return os.path.join(os.path.dirname(db.DB_PATH), "embedding_cache.db")
+
+
+def _get_embedding_cache():
+    """Return the shared embedding cache, or None when caching is disabled."""
+    if EMBEDDING_CACHE_MAX_MB <= 0:
+        return None
+    path = _resolve_embedding_cache_path()
+    if not path:
+        return None
+    with _EMBEDDING_CACHE_LOCK:
+        cache = _EMBEDDING_CACHES.get(path)
+        if cache is None:
+            cache = EmbeddingCache(
+                path,
+                int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+                EMBEDDING_CACHE_DTYPE,
+            )
+            _EMBEDDING_CACHES[path] = cache
+        return cache
+
+
+def shutdown_embedding_caches():
+    with _EMBEDDING_CACHE_LOCK:
+        caches = list(_EMBEDDING_CACHES.values())
+        _EMBEDDING_CACHES.clear()
+    for cache in caches:
+        cache.close()
+
+
+def _embed_with_cache(texts, progress_callback=None, stats=None):
+    """Embed ``texts``, sending only unique cache misses to TEI."""
+    text_hashes = [_embedding_text_hash(text) for text in texts]
+    cache = _get_embedding_cache()
+    cached = cache.get_many(TEI_MODEL, text_hashes) if cache is not None else {}
+
+    missing = {}
+    for text, text_hash in zip(texts, text_hashes):
+        if text_hash not in cached and text_hash not in missing:
+            missing[text_hash] = text
+
+    fresh = {}
+    if missing:
+        embeddings = _tei_embed(
+            list(missing.values()), progress_callback=progress_callback, stats=stats
+        )
+        if len(embeddings) != len(missing):
+            raise RuntimeError("TEI embedding response length mismatch.")
+        fresh = dict(zip(missing, embeddings))
+        if cache is not None:
+            cache.put_many(TEI_MODEL, fresh.items())
+
+    if stats is not None:
+        hits = sum(1 for text_hash in text_hashes if text_hash in cached)
+        stats["cache_hits"] = stats.get("cache_hits", 0) + hits
+        stats["cache_misses"] = stats.get("cache_misses", 0) + len(texts) - hits
+        stats["tei_texts"] = stats.get("tei_texts", 0) + len(missing)
+
+    return [
+        cached[text_hash] if text_hash in cached else fresh[text_hash]
+        for text_hash in text_hashes
+    ]
 
 
 def _get_qdrant_client():
@@ -432,6 +1361,75 @@ def _delete_qdrant_book_chunks(client, collection_name, book_id):
     return True
 
 
+def _fetch_stored_chunk_hashes(client, collection_name, book_id, limit=256):
+    """Map each stored point ID of ``book_id`` to its payload content hash."""
+    if not client.collection_exists(collection_name):
+        return {}
+
+    book_filter = _build_qdrant_book_filter(book_id)
+    stored = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=book_filter,
+            limit=limit,
+            offset=offset,
+            with_payload=["content_hash"],
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            stored[str(point.id)] = payload.get("content_hash")
+        if offset is None:
+            break
+    return stored
+
+
+def _delete_qdrant_points(client, collection_name, point_ids, batch_size=256):
+    from qdrant_client.http import models as qmodels
+
+    point_ids = list(point_ids)
+    for offset in range(0, len(point_ids), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=qmodels.PointIdsList(
+                points=point_ids[offset : offset + batch_size]
+            ),
+        )
+    return len(point_ids)
+
+
+def _get_cleanup_executor():
+    global _CLEANUP_EXECUTOR
+    with _CLEANUP_LOCK:
+        if _CLEANUP_EXECUTOR is None:
+            _CLEANUP_EXECUTOR = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="qdrant-cleanup"
+            )
+        return _CLEANUP_EXECUTOR
+
+
+def _run_background_cleanup(client, collection_name, book_id, point_ids):
+    try:
+        deleted = _delete_qdrant_points(client, collection_name, point_ids)
+    except Exception:
+        logger.exception("Background cleanup of stale points failed for %s.", book_id)
+        raise
+    logger.info("Deleted %s stale points for %s.", deleted, book_id)
+    return deleted
+
+
+def shutdown_cleanup_executor(wait=True):
+    """Stop the background cleanup worker, finishing queued deletions by default."""
+    global _CLEANUP_EXECUTOR
+    with _CLEANUP_LOCK:
+        executor = _CLEANUP_EXECUTOR
+        _CLEANUP_EXECUTOR = None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
 def purge_qdrant_chunks():
     qdrant_client = _get_qdrant_client()
     try:
@@ -498,14 +1496,16 @@ def cleanup_orphaned_qdrant_chunks(limit=256):
     return sorted(orphaned)
 
 
-def _build_qdrant_points(payloads, vector_dim, progress_callback=None):
+def _build_qdrant_points(payloads, vector_dim, progress_callback=None, stats=None):
     from qdrant_client.http import models as qmodels
 
     if not payloads:
         return [], vector_dim
 
     texts = [payload["text"] for payload in payloads]
-    embeddings = _tei_embed(texts, progress_callback=progress_callback)
+    embeddings = _embed_with_cache(
+        texts, progress_callback=progress_callback, stats=stats
+    )
     if not embeddings:
         raise RuntimeError("TEI embeddings are empty.")
 
@@ -522,21 +1522,404 @@ def _build_qdrant_points(payloads, vector_dim, progress_callback=None):
 
     points = []
     for payload, vector in zip(payloads, embeddings):
-        # Use deterministic UUIDs to satisfy Qdrant's point ID requirements.
-        point_id = uuid.uuid5(
-            uuid.NAMESPACE_URL, f"{payload['book_id']}:{payload['pos_start']}"
-        )
+        point_id = _chunk_point_id(payload["book_id"], payload["pos_start"])
         points.append(qmodels.PointStruct(id=point_id, vector=vector, payload=payload))
     return points, resolved_dim
 
 
-def ingest_epub(epub_path, progress_callback=None):
+class _PipelineStopped(Exception):
+    """Raised inside a pipeline stage once another stage has failed."""
+
+
+_PIPELINE_DONE = object()
+
+
+class _StagePipeline:
+    """Run stages on threads connected by bounded queues.
+
+    Every blocking operation polls a shared stop flag, so the first stage
+    error unblocks the others instead of deadlocking on a full queue.
+    """
+
+    def __init__(self, queue_size):
+        self._queue_size = queue_size
+        self._stop = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+        self._threads = []
+
+    def queue(self):
+        return queue.Queue(maxsize=self._queue_size)
+
+    def _check(self):
+        if self._stop.is_set():
+            raise _PipelineStopped()
+
+    def put(self, channel, item):
+        while True:
+            self._check()
+            try:
+                channel.put(item, timeout=_PIPELINE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def drain(self, channel):
+        while True:
+            self._check()
+            try:
+                item = channel.get(timeout=_PIPELINE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if item is _PIPELINE_DONE:
+                return
+            yield item
+
+    def acquire(self, semaphore):
+        while not semaphore.acquire(timeout=_PIPELINE_POLL_SECONDS):
+            self._check()
+
+    def wait_any(self, futures):
+        """Block until at least one of ``futures`` is done and return those."""
+        while True:
+            self._check()
+            done, _pending = wait(
+                futures, timeout=_PIPELINE_POLL_SECONDS, return_when=FIRST_COMPLETED
+            )
+            if done:
+                return done
+
+    def spawn(self, name, target, outbox=None):
+        def run():
+            try:
+                target()
+                if outbox is not None:
+                    self.put(outbox, _PIPELINE_DONE)
+            except _PipelineStopped:
+                pass
+            except Exception as exc:
+                with self._error_lock:
+                    if self._error is None:
+                        self._error = exc
+                self._stop.set()
+
+        thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+class _StreamingIngestion:
+    """Parse, chunk, embed and upsert one book as overlapping pipeline stages.
+
+    Chapters flow from the parser to the chunker, chunk payloads are grouped
+    for TEI, and embedded points are upserted as soon as they are ready, in
+    batches of ``upsert_batch_size`` with up to ``upsert_parallelism``
+    requests in flight. A semaphore caps the number of chunks between
+    chunking and upsert at ``max_inflight`` so peak memory does not grow with
+    book size.
+    """
+
+    def __init__(
+        self,
+        book,
+        book_id,
+        progress,
+        parse_workers=None,
+        max_inflight=None,
+        group_size=None,
+        queue_size=None,
+        stored_hashes=None,
+        qdrant_client=None,
+        upsert_batch_size=None,
+        upsert_parallelism=None,
+        upsert_wait=None,
+    ):
+        if max_inflight is None:
+            max_inflight = INGEST_MAX_INFLIGHT_CHUNKS
+        if group_size is None:
+            group_size = INGEST_EMBED_GROUP_SIZE
+        if queue_size is None:
+            queue_size = INGEST_QUEUE_SIZE
+        if max_inflight <= 0:
+            raise ValueError("INGEST_MAX_INFLIGHT_CHUNKS must be a positive integer.")
+        if group_size <= 0:
+            raise ValueError("INGEST_EMBED_GROUP_SIZE must be a positive integer.")
+        if queue_size <= 0:
+            raise ValueError("INGEST_QUEUE_SIZE must be a positive integer.")
+        if upsert_batch_size is None:
+            upsert_batch_size = QDRANT_UPSERT_BATCH_SIZE
+        if upsert_parallelism is None:
+            upsert_parallelism = QDRANT_UPSERT_PARALLELISM
+        if upsert_wait is None:
+            upsert_wait = QDRANT_UPSERT_WAIT
+        if upsert_batch_size <= 0:
+            raise ValueError("QDRANT_UPSERT_BATCH_SIZE must be a positive integer.")
+        if upsert_parallelism <= 0:
+            raise ValueError("QDRANT_UPSERT_PARALLELISM must be a positive integer.")
+
+        self._book = book
+        self._book_id = book_id
+        self._progress = progress
+        self._parse_workers = _resolve_parse_workers(parse_workers)
+        self._max_inflight = max_inflight
+        # A group can never wait on permits held by itself.
+        self._group_size = min(group_size, max_inflight)
+        # A partial upsert batch and a partial chunk group must never hold the
+        # whole budget between them, or neither could be completed.
+        self._upsert_batch_size = max(
+            1, min(upsert_batch_size, max_inflight - self._group_size + 1)
+        )
+        self._upsert_parallelism = upsert_parallelism
+        self._upsert_wait = upsert_wait
+        self._queue_size = queue_size
+        self._reported = {}
+        self._report_lock = threading.Lock()
+
+        # Point ID -> content hash of what is already in Qdrant for this book.
+        self._stored_hashes = stored_hashes or {}
+        self.qdrant_client = qdrant_client
+        self.chapters = []
+        self.total_sequences = 0
+        self.chunks_processed = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+        self.chunks_unchanged = 0
+        self.upsert_batches = 0
+        self.point_ids = set()
+        self.embedding_dim = None
+        self.embedding_seconds = 0.0
+        self.embedding_stats = {}
+        self.qdrant_seconds = 0.0
+        self._total_documents = 0
+        self._chunked_fraction = 0.0
+        self._chunking_done = False
+
+    def _report(self, stage_key, percent, detail=None):
+        percent = max(0, min(100, int(percent)))
+        with self._report_lock:
+            if percent <= self._reported.get(stage_key, -1):
+                return
+            self._reported[stage_key] = percent
+        if detail is None:
+            detail = f"{percent}%"
+        self._progress.stage(stage_key, percent, detail=detail)
+
+    def _estimated_total_chunks(self):
+        if self._chunking_done or self._chunked_fraction <= 0:
+            return self.chunks_processed
+        return self.chunks_processed / self._chunked_fraction
+
+    def _stage_percent(self, done):
+        total = self._estimated_total_chunks()
+        if total <= 0:
+            return 0
+        percent = int((done / total) * 100)
+        return percent if self._chunking_done else min(percent, 99)
+
+    def _parse(self, pipeline, outbox):
+        seq_id = 0
+        chapter_index = 0
+        documents = _iter_parsed_spine_documents(self._book, self._parse_workers)
+        for document_index, (sentences, h1_title) in enumerate(documents, start=1):
+            fraction = document_index / self._total_documents
+            if sentences:
+                chapter_title = h1_title
+                if chapter_title is None:
+                    chapter_title = f"Chapter {chapter_index + 1}"
+                end_seq = seq_id + len(sentences) - 1
+                self.chapters.append((chapter_index, chapter_title, seq_id, end_seq))
+                pipeline.put(outbox, (fraction, chapter_index, seq_id, sentences))
+                seq_id = end_seq + 1
+                chapter_index += 1
+            self._report("parsing", fraction * 100)
+        self.total_sequences = seq_id
+        self._report("parsing", 100)
+
+    def _chunk(self, pipeline, inbox, outbox, budget):
+        group = []
+        for fraction, chapter_index, start_seq, sentences in pipeline.drain(inbox):
+            stream = [
+                SentenceStreamItem(start_seq + offset, chapter_index, sentence)
+                for offset, sentence in enumerate(sentences)
+            ]
+            chunks = create_fixed_window_chunks(stream)
+            for payload in build_chunk_payloads(self._book_id, stream, chunks):
+                pipeline.acquire(budget)
+                group.append(payload)
+                self.chunks_processed += 1
+                if len(group) >= self._group_size:
+                    pipeline.put(outbox, group)
+                    group = []
+            self._chunked_fraction = fraction
+            self._report("chunking", fraction * 100)
+        if group:
+            pipeline.put(outbox, group)
+        self._chunking_done = True
+        self._report("chunking", 100)
+
+    def _split_unchanged(self, group):
+        changed = []
+        for payload in group:
+            point_id = str(_chunk_point_id(self._book_id, payload["pos_start"]))
+            if self._stored_hashes.get(point_id) == payload["content_hash"]:
+                self.point_ids.add(point_id)
+            else:
+                changed.append(payload)
+        return changed
+
+    def _embed(self, pipeline, inbox, outbox, budget):
+        for group in pipeline.drain(inbox):
+            if self.qdrant_client is None:
+                self.qdrant_client = _get_qdrant_client()
+                _ensure_qdrant_available(self.qdrant_client)
+            embedded_before = self.chunks_embedded
+
+            changed = self._split_unchanged(group)
+            unchanged = len(group) - len(changed)
+            if unchanged:
+                # Unchanged chunks are already stored; they never reach the
+                # upsert stage, so return their budget here.
+                self.chunks_unchanged += unchanged
+                budget.release(unchanged)
+            if not changed:
+                self.chunks_embedded += len(group)
+                self._report("embedding", self._stage_percent(self.chunks_embedded))
+                continue
+
+            def embedding_progress(
+                processed, _total, _batch_index, _total_batches, base=embedded_before
+            ):
+                done = base + processed
+                self._report("embedding", self._stage_percent(done))
+
+            vector_dim = self.embedding_dim
+            if vector_dim is None:
+                vector_dim = QDRANT_VECTOR_DIM
+            embedding_start = time.monotonic()
+            points, vector_dim = _build_qdrant_points(
+                changed,
+                vector_dim,
+                progress_callback=embedding_progress,
+                stats=self.embedding_stats,
+            )
+            self.embedding_seconds += time.monotonic() - embedding_start
+            self.embedding_dim = vector_dim
+            self.chunks_embedded += len(group)
+            self._report("embedding", self._stage_percent(self.chunks_embedded))
+            pipeline.put(outbox, points)
+        self._report("embedding", 100)
+
+    def _upsert_batch(self, points):
+        start = time.monotonic()
+        if self._upsert_wait:
+            self.qdrant_client.upsert(collection_name=QDRANT_COLLECTION, points=points)
+        else:
+            self.qdrant_client.upsert(
+                collection_name=QDRANT_COLLECTION, points=points, wait=False
+            )
+        return time.monotonic() - start
+
+    def _finish_upserts(self, done, inflight, budget):
+        for future in done:
+            points = inflight.pop(future)
+            self.qdrant_seconds += future.result()
+            self.point_ids.update(str(point.id) for point in points)
+            self.chunks_upserted += len(points)
+            self.upsert_batches += 1
+            budget.release(len(points))
+            percent = self._stage_percent(self.chunks_upserted + self.chunks_unchanged)
+            self._report(
+                "qdrant",
+                percent,
+                detail=f"{min(100, percent)}% ({self.upsert_batches} batches)",
+            )
+
+    def _upsert(self, pipeline, inbox, budget):
+        collection_ready = False
+        buffer = []
+        inflight = {}
+        last_points = None
+        executor = ThreadPoolExecutor(
+            max_workers=self._upsert_parallelism, thread_name_prefix="qdrant-upsert"
+        )
+
+        def submit(points):
+            while len(inflight) >= self._upsert_parallelism:
+                self._finish_upserts(pipeline.wait_any(inflight), inflight, budget)
+            inflight[executor.submit(self._upsert_batch, points)] = points
+
+        try:
+            for points in pipeline.drain(inbox):
+                if not collection_ready:
+                    _ensure_qdrant_collection(
+                        self.qdrant_client, QDRANT_COLLECTION, self.embedding_dim
+                    )
+                    collection_ready = True
+                buffer.extend(points)
+                while len(buffer) >= self._upsert_batch_size:
+                    last_points = buffer[: self._upsert_batch_size]
+                    buffer = buffer[self._upsert_batch_size :]
+                    submit(last_points)
+            if buffer:
+                last_points = buffer
+                submit(last_points)
+            while inflight:
+                self._finish_upserts(pipeline.wait_any(inflight), inflight, budget)
+            if not self._upsert_wait and last_points:
+                # Qdrant applies a shard's updates in order, so once a waited
+                # write lands every acknowledged batch before it is visible.
+                barrier_start = time.monotonic()
+                self.qdrant_client.upsert(
+                    collection_name=QDRANT_COLLECTION, points=last_points[-1:]
+                )
+                self.qdrant_seconds += time.monotonic() - barrier_start
+        finally:
+            for future in inflight:
+                future.cancel()
+            executor.shutdown(wait=True)
+        self._report("qdrant", 100)
+
+    def run(self):
+        self._total_documents = max(1, sum(1 for _ in _iter_spine_contents(self._book)))
+        for stage_key in ("parsing", "chunking", "embedding", "qdrant"):
+            self._report(stage_key, 0)
+
+        pipeline = _StagePipeline(self._queue_size)
+        chapters = pipeline.queue()
+        groups = pipeline.queue()
+        points = pipeline.queue()
+        budget = threading.Semaphore(self._max_inflight)
+
+        pipeline.spawn(
+            "parse", lambda: self._parse(pipeline, chapters), outbox=chapters
+        )
+        pipeline.spawn(
+            "chunk",
+            lambda: self._chunk(pipeline, chapters, groups, budget),
+            outbox=groups,
+        )
+        pipeline.spawn(
+            "embed",
+            lambda: self._embed(pipeline, groups, points, budget),
+            outbox=points,
+        )
+        pipeline.spawn("upsert", lambda: self._upsert(pipeline, points, budget))
+        pipeline.join()
+        return self
+
+
+def ingest_epub(
+    epub_path, progress_callback=None, parse_workers=None, background_cleanup=None
+):
     """Parse EPUB, tokenize sentences, and store in Qdrant & SQLite."""
     print(f"Ingesting: {epub_path}")
     ingest_start = time.monotonic()
-    embedding_seconds = 0.0
-    qdrant_seconds = 0.0
-    chunks_processed = 0
     progress = IngestionProgress(progress_callback)
 
     # 1. Hashing and Deduplication
@@ -574,54 +1957,56 @@ def ingest_epub(epub_path, progress_callback=None):
     if is_reingest:
         db.delete_chapters(book_hash)
 
-    progress.stage("parsing", 0)
-
-    def parsing_progress(message, percent):
-        progress.stage("parsing", percent, detail=f"{percent}%")
-
-    stream, chapters = build_sentence_stream(book, parsing_progress)
-    progress.stage("parsing", 100)
-
-    progress.stage("chunking", 0)
-    chunks = create_fixed_window_chunks(stream, chapters=chapters)
-    progress.stage("chunking", 100)
-    chunk_payloads = build_chunk_payloads(book_hash, stream, chunks)
-    chunks_processed = len(chunk_payloads)
-    embedding_model = TEI_MODEL
-    embedding_dim = None
-
-    if chunk_payloads:
+    # Parsing, chunking, embedding and upserts overlap. On re-ingest only
+    # chunks whose content hash differs from the stored point are embedded and
+    # upserted (in place, by deterministic ID) and stale IDs are pruned
+    # afterwards, so the book stays searchable throughout.
+    qdrant_client = None
+    stored_hashes = {}
+    if is_reingest:
         qdrant_client = _get_qdrant_client()
         _ensure_qdrant_available(qdrant_client)
-        progress.stage("embedding", 0)
-        embedding_start = time.monotonic()
-
-        def embedding_progress(processed, total, batch_index, total_batches):
-            if total <= 0:
-                return
-            percent = int((processed / total) * 100)
-            progress.stage(
-                "embedding",
-                percent,
-                detail=f"{percent}%",
-            )
-
-        points, vector_dim = _build_qdrant_points(
-            chunk_payloads,
-            QDRANT_VECTOR_DIM,
-            progress_callback=embedding_progress,
+        stored_hashes = _fetch_stored_chunk_hashes(
+            qdrant_client, QDRANT_COLLECTION, book_hash
         )
-        embedding_seconds = time.monotonic() - embedding_start
-        embedding_dim = vector_dim
-        progress.stage("embedding", 100)
-        _ensure_qdrant_collection(qdrant_client, QDRANT_COLLECTION, vector_dim)
-        if is_reingest:
-            _delete_qdrant_book_chunks(qdrant_client, QDRANT_COLLECTION, book_hash)
-        progress.stage("qdrant", 0)
-        qdrant_start = time.monotonic()
-        qdrant_client.upsert(collection_name=QDRANT_COLLECTION, points=points)
-        qdrant_seconds = time.monotonic() - qdrant_start
-        progress.stage("qdrant", 100)
+        if existing.get("embedding_model") != TEI_MODEL:
+            # Stored vectors come from another model; keep the IDs for pruning
+            # but re-embed every chunk.
+            stored_hashes = dict.fromkeys(stored_hashes)
+    run = _StreamingIngestion(
+        book,
+        book_hash,
+        progress,
+        parse_workers,
+        stored_hashes=stored_hashes,
+        qdrant_client=qdrant_client,
+    ).run()
+    stale_ids = [
+        point_id for point_id in stored_hashes if point_id not in run.point_ids
+    ]
+    if background_cleanup is None:
+        background_cleanup = INGEST_BACKGROUND_CLEANUP
+    stale_points_deleted = 0
+    if stale_ids and background_cleanup:
+        _get_cleanup_executor().submit(
+            _run_background_cleanup,
+            run.qdrant_client,
+            QDRANT_COLLECTION,
+            book_hash,
+            stale_ids,
+        )
+    elif stale_ids:
+        stale_points_deleted = _delete_qdrant_points(
+            run.qdrant_client, QDRANT_COLLECTION, stale_ids
+        )
+    chapters = run.chapters
+    total_sequences = run.total_sequences
+    chunks_processed = run.chunks_processed
+    embedding_model = TEI_MODEL
+    embedding_dim = run.embedding_dim
+    if embedding_dim is None and is_reingest:
+        # Nothing was re-embedded, so the stored dimension still applies.
+        embedding_dim = existing.get("embedding_dim")
 
     progress.stage("metadata", 0)
     for chapter_index, chapter_title, start_seq, end_seq in chapters:
@@ -636,7 +2021,7 @@ def ingest_epub(epub_path, progress_callback=None):
             title,
             author,
             epub_path,
-            len(stream),
+            total_sequences,
             embedding_model,
             embedding_dim,
         )
@@ -646,7 +2031,7 @@ def ingest_epub(epub_path, progress_callback=None):
             title,
             author,
             epub_path,
-            len(stream),
+            total_sequences,
             embedding_model,
             embedding_dim,
         )
@@ -659,19 +2044,39 @@ def ingest_epub(epub_path, progress_callback=None):
     progress.stage("metadata", 100)
 
     total_seconds = time.monotonic() - ingest_start
+    cache_hits = run.embedding_stats.get("cache_hits", 0)
+    cache_misses = run.embedding_stats.get("cache_misses", 0)
+    cache_lookups = cache_hits + cache_misses
+    tokens_actual = run.embedding_stats.get("tokens_actual", 0)
+    tokens_padded = run.embedding_stats.get("tokens_padded", 0)
     chunks_per_second = (chunks_processed / total_seconds) if total_seconds else 0.0
     metrics = {
         "event": "ingestion_metrics",
         "book_id": book_hash,
         "total_time_s": round(total_seconds, 3),
-        "embedding_time_s": round(embedding_seconds, 3),
-        "qdrant_upsert_time_s": round(qdrant_seconds, 3),
+        "embedding_time_s": round(run.embedding_seconds, 3),
+        "qdrant_upsert_time_s": round(run.qdrant_seconds, 3),
+        "qdrant_upsert_batches": run.upsert_batches,
         "chunks_processed": chunks_processed,
         "chunks_per_sec": round(chunks_per_second, 3),
+        "chunks_unchanged": run.chunks_unchanged,
+        "stale_points_deleted": stale_points_deleted,
+        "stale_points_scheduled": len(stale_ids) - stale_points_deleted,
+        "embedding_cache_hits": cache_hits,
+        "embedding_cache_misses": cache_misses,
+        "embedding_cache_hit_rate": round(cache_hits / cache_lookups, 4)
+        if cache_lookups
+        else 0.0,
+        "tei_texts_embedded": run.embedding_stats.get("tei_texts", 0),
+        "embedding_tokens_actual": tokens_actual,
+        "embedding_tokens_padded": tokens_padded,
+        "embedding_padding_ratio": round(tokens_padded / tokens_actual, 3)
+        if tokens_actual
+        else 0.0,
     }
     _get_metrics_logger().debug(json.dumps(metrics))
 
-    print(f"Finished ingesting. ID: {book_hash}. Total sequences: {len(stream)}")
+    print(f"Finished ingesting. ID: {book_hash}. Total sequences: {total_sequences}")
     return book_hash
 
 
@@ -18,6 +18,10 @@ async def lifespan(_app: FastAPI):
     db.init_db()
     ingest.cleanup_orphaned_qdrant_chunks()
     yield
+    ingest.shutdown_parse_pools()
+    ingest.shutdown_tei_clients()
+    ingest.shutdown_embedding_caches()
+    ingest.shutdown_cleanup_executor()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -0,0 +1,94 @@
+"""Compare the full and sentence-only spaCy pipelines on real EPUBs.
+
+Usage: python scripts/benchmark_segmentation.py <book.epub> [<book.epub> ...]
+
+Prints one JSON line per book with parse timings for both pipelines and how
+closely the sentence-only boundaries agree with the full pipeline.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import ingest  # noqa: E402
+
+
+def _segment_full(texts):
+    return [ingest.extract_sentences(text, pipeline="full") for text in texts]
+
+
+def _segment_sentences(texts):
+    return ingest.extract_sentences_batch(texts, pipeline="sentences")
+
+
+def _compare(baseline, candidate):
+    baseline_total = sum(len(sentences) for sentences in baseline)
+    candidate_total = sum(len(sentences) for sentences in candidate)
+    common = 0
+    identical_documents = 0
+    for expected, actual in zip(baseline, candidate):
+        common += sum((Counter(expected) & Counter(actual)).values())
+        if expected == actual:
+            identical_documents += 1
+    total = baseline_total + candidate_total
+    agreement = (2 * common / total) if total else 1.0
+    return {
+        "documents": len(baseline),
+        "identical_documents": identical_documents,
+        "full_sentences": baseline_total,
+        "sentences_sentences": candidate_total,
+        "sentence_agreement": round(agreement, 4),
+    }
+
+
+def benchmark(epub_path):
+    book = ingest.epub.read_epub(epub_path)
+    texts = [
+        ingest.clean_html(raw_content)
+        for raw_content in ingest._iter_spine_contents(book)
+    ]
+
+    # Load both pipelines up front so timings only cover segmentation.
+    ingest.get_nlp("full")
+    ingest.get_nlp("sentences")
+
+    start = time.perf_counter()
+    full = _segment_full(texts)
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sentences = _segment_sentences(texts)
+    sentences_seconds = time.perf_counter() - start
+
+    result = {
+        "event": "segmentation_benchmark",
+        "epub": epub_path,
+        "full_time_s": round(full_seconds, 3),
+        "sentences_time_s": round(sentences_seconds, 3),
+        "speedup": round(full_seconds / sentences_seconds, 2)
+        if sentences_seconds
+        else None,
+        "batch_size": ingest.SPACY_BATCH_SIZE,
+        "n_process": ingest.SPACY_N_PROCESS,
+    }
+    result.update(_compare(full, sentences))
+    return result
+
+
+def main(argv):
+    if not argv:
+        print("Usage: python scripts/benchmark_segmentation.py <book.epub> [...]")
+        return 1
+    for epub_path in argv:
+        print(json.dumps(benchmark(epub_path)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
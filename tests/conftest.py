@@ -1,7 +1,47 @@
 import sys
 from pathlib import Path
 
+import pytest
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def make_epub(tmp_path):
+    """Write an EPUB with the given (title, html) chapters and return its path."""
+    from ebooklib import epub
+
+    def _make_epub(chapters, name="sample.epub", title="Sample Book"):
+        book = epub.EpubBook()
+        book.set_identifier(name)
+        book.set_title(title)
+        book.set_language("en")
+
+        items = []
+        for index, (chapter_title, content) in enumerate(chapters, start=1):
+            item = epub.EpubHtml(
+                title=chapter_title, file_name=f"chap_{index}.xhtml", content=content
+            )
+            book.add_item(item)
+            items.append(item)
+
+        book.toc = tuple(items)
+        book.add_item(epub.EpubNcx())
+        book.add_item(epub.EpubNav())
+        book.spine = ["nav", *items]
+
+        book_path = tmp_path / name
+        epub.write_epub(str(book_path), book)
+        return book_path
+
+    return _make_epub
+
+
+@pytest.fixture
+def sample_chapters():
+    return [
+        ("Chapter 1", "<h1>Chapter 1</h1><p>First sentence. Second sentence.</p>"),
+        ("Chapter 2", "<h1>Chapter 2</h1><p>Third sentence.</p>"),
+    ]
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+import db
+import ingest
+
+
+def _counting_embed(monkeypatch, dim=4):
+    calls = []
+
+    def fake_embed(texts, **_kwargs):
+        calls.append(list(texts))
+        return [ingest._hash_embedding(text, dim=dim) for text in texts]
+
+    monkeypatch.setattr(ingest, "_tei_embed", fake_embed)
+    return calls
+
+
+@pytest.fixture
+def cache_path(monkeypatch, tmp_path):
+    path = tmp_path / "embedding_cache.db"
+    monkeypatch.setattr(ingest, "EMBEDDING_CACHE_PATH", str(path))
+    yield path
+    ingest.shutdown_embedding_caches()
+
+
+def test_embed_with_cache_sends_unique_misses_once(monkeypatch, cache_path):
+    calls = _counting_embed(monkeypatch)
+    stats = {}
+
+    first = ingest._embed_with_cache(["alpha", "beta", "alpha"], stats=stats)
+    second = ingest._embed_with_cache(["beta ", "gamma", "alpha"], stats=stats)
+
+    assert calls == [["alpha", "beta"], ["gamma"]]
+    assert first[0] == first[2]
+    # Hits come back from float32 storage.
+    assert second[0] == pytest.approx(first[1])
+    assert second[2] == pytest.approx(first[0])
+    assert stats == {"cache_hits": 2, "cache_misses": 4, "tei_texts": 3}
+
+
+def test_embedding_cache_is_keyed_by_model(monkeypatch, cache_path):
+    calls = _counting_embed(monkeypatch)
+
+    ingest._embed_with_cache(["alpha"])
+    monkeypatch.setattr(ingest, "TEI_MODEL", "other/model")
+    ingest._embed_with_cache(["alpha"])
+
+    assert calls == [["alpha"], ["alpha"]]
+
+
+def test_embedding_cache_float16_storage(tmp_path):
+    cache = ingest.EmbeddingCache(str(tmp_path / "cache.db"), 1 << 20, "float16")
+    cache.put_many("model", [("hash", [0.1, -0.5, 0.333333])])
+
+    vector = cache.get_many("model", ["hash"])["hash"]
+
+    assert vector == pytest.approx([0.1, -0.5, 0.333333], abs=1e-3)
+    assert cache.size_bytes() == 6
+    cache.close()
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    # Three float32 vectors of dimension 2 fit in 24 bytes.
+    cache = ingest.EmbeddingCache(str(tmp_path / "cache.db"), 24, "float32")
+    cache.put_many("model", [("a", [1.0, 1.0])])
+    cache.put_many("model", [("b", [2.0, 2.0])])
+    cache.put_many("model", [("c", [3.0, 3.0])])
+    cache.get_many("model", ["a"])
+
+    cache.put_many("model", [("d", [4.0, 4.0])])
+
+    assert set(cache.get_many("model", ["a", "b", "c", "d"])) == {"a", "c", "d"}
+    cache.close()
+
+
+def test_embedding_cache_rejects_unknown_dtype(tmp_path):
+    with pytest.raises(ValueError, match="EMBEDDING_CACHE_DTYPE"):
+        ingest.EmbeddingCache(str(tmp_path / "cache.db"), 1024, "float64")
+
+
+def test_embedding_cache_disabled(monkeypatch, cache_path):
+    calls = _counting_embed(monkeypatch)
+    monkeypatch.setattr(ingest, "EMBEDDING_CACHE_MAX_MB", 0)
+
+    ingest._embed_with_cache(["alpha"])
+    ingest._embed_with_cache(["alpha"])
+
+    assert calls == [["alpha"], ["alpha"]]
+    assert not cache_path.exists()
+
+
+class _FakeQdrantClient:
+    def __init__(self):
+        self.points = {}
+
+    def collection_exists(self, _name):
+        return bool(self.points)
+
+    def create_collection(self, **_kwargs):
+        return None
+
+    def upsert(self, collection_name, points):
+        for point in points:
+            self.points[str(point.id)] = point
+
+    def scroll(self, **_kwargs):
+        return list(self.points.values()), None
+
+    def delete(self, collection_name, points_selector):
+        for point_id in points_selector.points:
+            self.points.pop(str(point_id), None)
+
+
+def _ingestion_metrics(stdout):
+    for line in stdout.splitlines():
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if payload.get("event") == "ingestion_metrics":
+            return payload
+    return None
+
+
+def test_reingest_reuses_cached_embeddings(
+    monkeypatch, tmp_path, capsys, make_epub, sample_chapters
+):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setattr(ingest, "EMBEDDING_CACHE_PATH", None)
+    db.init_db()
+    fake_qdrant = _FakeQdrantClient()
+    monkeypatch.setattr(ingest, "_get_qdrant_client", lambda: fake_qdrant)
+    monkeypatch.setattr(ingest, "_ensure_qdrant_available", lambda _client: None)
+    monkeypatch.setattr(ingest, "_ensure_qdrant_collection", lambda *_args: None)
+    calls = _counting_embed(monkeypatch)
+
+    first_path = make_epub(sample_chapters, name="first.epub")
+    second_path = make_epub(sample_chapters, name="second.epub", title="Edited")
+    ingest.ingest_epub(str(first_path))
+    first = _ingestion_metrics(capsys.readouterr().out)
+    embedded = sum(len(batch) for batch in calls)
+    ingest.ingest_epub(str(second_path))
+    second = _ingestion_metrics(capsys.readouterr().out)
+
+    assert (tmp_path / "embedding_cache.db").exists()
+    assert first["embedding_cache_hit_rate"] == 0.0
+    assert first["tei_texts_embedded"] == embedded
+    assert second["embedding_cache_hits"] == first["chunks_processed"]
+    assert second["embedding_cache_hit_rate"] == 1.0
+    assert second["tei_texts_embedded"] == 0
+    assert sum(len(batch) for batch in calls) == embedded
+    ingest.shutdown_embedding_caches()
@@ -0,0 +1,65 @@
+import pytest
+from ebooklib import epub
+
+import ingest
+
+XHTML_DOCUMENTS = [
+    b"<?xml version='1.0' encoding='utf-8'?>\n<!DOCTYPE html>\n"
+    b'<html xmlns="http://www.w3.org/1999/xhtml">\n  <head/>\n'
+    b"  <body><h1>Chapter 1</h1>\n    <p>First sentence. Second sentence.</p>\n"
+    b"  </body>\n</html>\n",
+    b"<html><head><title>Title</title><style>p {}</style></head>"
+    b"<body><h1>\n  A <span>B</span>\n<br/></h1><h1>Second</h1>"
+    b"<div>one<br/>two<p>three <!-- note -->\n </p></div>tail</body></html>\n\n",
+    b"<html><body><pre>  keep\n  this  </pre><ruby>kan<rt>ka</rt></ruby>"
+    b"<p>\xc3\xa9t\xc3\xa9 &amp; more</p></body></html><!-- end -->\n",
+]
+
+FALLBACK_DOCUMENTS = [
+    b"<html><body><p>entity&nbsp;text</p></body></html>",
+    b"<html>\r\n<body><p>windows\r\nlines</p></body></html>",
+    b"<html><body><p>a<p>b</body></html>",
+    b"<h1>Fragment</h1><p>No root element.</p>",
+    b"<html><body><script><p>not markup</p></script><p>x</p></body></html>",
+]
+
+
+def _expected(raw_content):
+    return ingest.clean_html(raw_content), ingest._find_h1_title(raw_content)
+
+
+@pytest.mark.parametrize("raw_content", XHTML_DOCUMENTS + FALLBACK_DOCUMENTS)
+def test_extract_html_matches_clean_html_and_title(raw_content):
+    extraction = ingest.extract_html(raw_content)
+
+    assert (extraction.text, extraction.title) == _expected(raw_content)
+
+
+@pytest.mark.parametrize("raw_content", XHTML_DOCUMENTS)
+def test_extract_html_streams_well_formed_xhtml(raw_content):
+    markup = ingest._decode_html(raw_content)
+
+    assert ingest._extract_html_xml(markup) == ingest._extract_html_soup(markup)
+
+
+@pytest.mark.parametrize("raw_content", FALLBACK_DOCUMENTS)
+def test_extract_html_falls_back_for_non_xml_documents(raw_content):
+    assert ingest._extract_html_xml(ingest._decode_html(raw_content)) is None
+
+
+def test_extract_html_reports_block_boundaries():
+    extraction = ingest.extract_html(
+        b"<html><body><h1>Title</h1><div><p>One.</p><p>Two.</p></div></body></html>"
+    )
+
+    assert extraction.text == "Title One. Two.  "
+    blocks = [extraction.text[start:end] for start, end in extraction.blocks]
+    assert blocks == ["Title ", "One. Two.  ", "One. ", "Two. "]
+
+
+def test_extract_html_matches_fixture_spine(make_epub, sample_chapters):
+    book = epub.read_epub(str(make_epub(sample_chapters)))
+
+    for raw_content in ingest._iter_spine_contents(book):
+        extraction = ingest.extract_html(raw_content)
+        assert (extraction.text, extraction.title) == _expected(raw_content)
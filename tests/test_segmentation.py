@@ -0,0 +1,51 @@
+import pytest
+from ebooklib import epub
+
+import ingest
+import scripts.benchmark_segmentation as benchmark
+
+
+def test_sentences_pipeline_disables_unused_components():
+    nlp = ingest.get_nlp("sentences")
+
+    assert set(nlp.pipe_names) <= set(ingest.SENTENCE_COMPONENTS)
+
+
+def test_get_nlp_rejects_unknown_pipeline():
+    with pytest.raises(ValueError, match="SPACY_PIPELINE must be one of"):
+        ingest.get_nlp("tagger-only")
+
+
+def test_extract_sentences_batch_matches_per_text_extraction():
+    texts = [
+        "First sentence here. Second sentence here.",
+        "",
+        "Another chapter starts. It ends too.",
+    ]
+
+    batched = ingest.extract_sentences_batch(texts, pipeline="sentences", batch_size=2)
+
+    assert batched == [
+        ingest.extract_sentences(text, pipeline="full") for text in texts
+    ]
+
+
+def test_build_sentence_stream_sentences_pipeline_matches_full(
+    monkeypatch, make_epub, sample_chapters
+):
+    book = epub.read_epub(str(make_epub(sample_chapters)))
+    full = ingest.build_sentence_stream(book, workers=1)
+
+    monkeypatch.setattr(ingest, "SPACY_PIPELINE", "sentences")
+    sentences = ingest.build_sentence_stream(book, workers=1)
+
+    assert sentences == full
+
+
+def test_benchmark_reports_boundary_agreement(make_epub, sample_chapters):
+    result = benchmark.benchmark(str(make_epub(sample_chapters)))
+
+    assert result["event"] == "segmentation_benchmark"
+    assert result["documents"] == 2
+    assert result["full_sentences"] == result["sentences_sentences"] == 3
+    assert result["sentence_agreement"] == 1.0
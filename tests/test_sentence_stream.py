@@ -75,3 +75,13 @@ def test_build_sentence_stream_reports_progress(tmp_path):
         "Processing Chapter 1",
         "Processing Chapter 2",
     ]
+
+
+def test_build_sentence_stream_parallel_matches_serial(tmp_path):
+    book_path = _write_sample_book(tmp_path)
+    book = epub.read_epub(str(book_path))
+
+    serial = build_sentence_stream(book, workers=1)
+    parallel = build_sentence_stream(book, workers=2)
+
+    assert parallel == serial
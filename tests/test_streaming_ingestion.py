@@ -0,0 +1,269 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from ebooklib import epub
+
+import db
+import ingest
+
+
+class _FakeQdrantClient:
+    def __init__(self, vector_dim, points=None):
+        self._vector_dim = vector_dim
+        self._collection_exists = True
+        self.points = {str(point.id): point for point in points or []}
+        self.upsert_calls = 0
+        self.deleted = []
+
+    def get_collections(self):
+        return []
+
+    def collection_exists(self, _name):
+        return self._collection_exists
+
+    def get_collection(self, _name):
+        return SimpleNamespace(
+            config=SimpleNamespace(
+                params=SimpleNamespace(vectors=SimpleNamespace(size=self._vector_dim))
+            )
+        )
+
+    def create_collection(self, **_kwargs):
+        self._collection_exists = True
+
+    def upsert(self, collection_name, points):
+        self.upsert_calls += 1
+        for point in points:
+            self.points[str(point.id)] = point
+
+    def scroll(self, **_kwargs):
+        return list(self.points.values()), None
+
+    def delete(self, collection_name, points_selector):
+        for point_id in points_selector.points:
+            self.deleted.append(str(point_id))
+            self.points.pop(str(point_id), None)
+
+
+def _chapters(count, sentences_per_chapter):
+    chapters = []
+    for index in range(count):
+        body = " ".join(
+            f"Chapter {index} sentence number {number} is here."
+            for number in range(sentences_per_chapter)
+        )
+        chapters.append((f"Chapter {index}", f"<h1>Part {index}</h1><p>{body}</p>"))
+    return chapters
+
+
+def _setup(monkeypatch, tmp_path, vector_dim=8, points=None):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "state.db"))
+    db.init_db()
+    fake_qdrant = _FakeQdrantClient(vector_dim, points)
+    monkeypatch.setattr(ingest, "_get_qdrant_client", lambda: fake_qdrant)
+    monkeypatch.setattr(ingest, "_ensure_qdrant_available", lambda _client: None)
+    monkeypatch.setattr(
+        ingest,
+        "_tei_embed",
+        lambda texts, **_kwargs: [
+            ingest._hash_embedding(text, dim=vector_dim) for text in texts
+        ],
+    )
+    return fake_qdrant
+
+
+def test_streaming_ingestion_matches_batch_payloads(monkeypatch, tmp_path, make_epub):
+    fake_qdrant = _setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(ingest, "INGEST_EMBED_GROUP_SIZE", 3)
+    epub_path = make_epub(_chapters(4, 11))
+
+    book_id = ingest.ingest_epub(str(epub_path))
+
+    book = epub.read_epub(str(epub_path))
+    stream, chapters = ingest.build_sentence_stream(book)
+    chunks = ingest.create_fixed_window_chunks(stream, chapters=chapters)
+    expected = ingest.build_chunk_payloads(book_id, stream, chunks)
+
+    stored = sorted(
+        (point.payload for point in fake_qdrant.points.values()),
+        key=lambda payload: payload["pos_start"],
+    )
+    assert stored == expected
+    assert fake_qdrant.upsert_calls == -(-len(expected) // 3)
+    assert db.get_book(book_id)["total_sequences"] == len(stream)
+    assert [
+        (c["chapter_index"], c["title"], c["start_seq_id"], c["end_seq_id"])
+        for c in db.get_chapters_list(book_id)
+    ] == chapters
+
+
+def test_streaming_ingestion_respects_inflight_budget(monkeypatch, tmp_path, make_epub):
+    fake_qdrant = _setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(ingest, "INGEST_MAX_INFLIGHT_CHUNKS", 2)
+    monkeypatch.setattr(ingest, "INGEST_EMBED_GROUP_SIZE", 8)
+
+    inflight = {"current": 0, "peak": 0}
+    lock = threading.Lock()
+    original_build = ingest.build_chunk_payloads
+    original_upsert = fake_qdrant.upsert
+
+    def counting_payloads(*args, **kwargs):
+        for payload in original_build(*args, **kwargs):
+            with lock:
+                inflight["current"] += 1
+                inflight["peak"] = max(inflight["peak"], inflight["current"])
+            yield payload
+
+    def counting_upsert(collection_name, points):
+        with lock:
+            inflight["current"] -= len(points)
+        original_upsert(collection_name, points)
+
+    monkeypatch.setattr(ingest, "build_chunk_payloads", counting_payloads)
+    monkeypatch.setattr(fake_qdrant, "upsert", counting_upsert)
+
+    ingest.ingest_epub(str(make_epub(_chapters(3, 20))))
+
+    # One chunk may be produced while waiting for a free slot in the budget.
+    assert inflight["peak"] <= 3
+    assert fake_qdrant.points
+
+
+def test_streaming_ingestion_reports_every_stage(monkeypatch, tmp_path, make_epub):
+    _setup(monkeypatch, tmp_path)
+    updates = []
+
+    def record_progress(message, percent, detail=None):
+        updates.append((message, percent))
+
+    ingest.ingest_epub(str(make_epub(_chapters(2, 12))), record_progress)
+
+    for stage_key, _label, _weight in ingest.INGESTION_STAGES:
+        prefix = f"({ingest.INGESTION_STAGE_INDEX[stage_key]}/"
+        stage_percents = [p for message, p in updates if message.startswith(prefix)]
+        assert stage_percents[-1] == 100
+        assert stage_percents == sorted(stage_percents)
+
+
+def test_streaming_ingestion_propagates_stage_errors(monkeypatch, tmp_path, make_epub):
+    _setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(ingest, "INGEST_EMBED_GROUP_SIZE", 1)
+    monkeypatch.setattr(ingest, "INGEST_MAX_INFLIGHT_CHUNKS", 1)
+
+    def failing_embed(_texts, **_kwargs):
+        raise RuntimeError("TEI embedding service is unavailable.")
+
+    monkeypatch.setattr(ingest, "_tei_embed", failing_embed)
+
+    with pytest.raises(RuntimeError, match="TEI embedding service is unavailable"):
+        ingest.ingest_epub(str(make_epub(_chapters(3, 20))))
+
+
+def test_reingest_prunes_only_stale_points(monkeypatch, tmp_path, make_epub):
+    stale = SimpleNamespace(id="stale-point", payload={"book_id": "ignored"})
+    fake_qdrant = _setup(monkeypatch, tmp_path, points=[stale])
+    epub_path = make_epub(_chapters(2, 10))
+    book_id = ingest.get_file_hash(str(epub_path))
+    db.add_book(book_id, "Old", "Author", str(epub_path), 1)
+
+    ingest.ingest_epub(str(epub_path))
+
+    assert fake_qdrant.deleted == ["stale-point"]
+    assert "stale-point" not in fake_qdrant.points
+    assert fake_qdrant.points
+
+
+def _reingest_setup(monkeypatch, tmp_path):
+    fake_qdrant = _setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(ingest, "EMBEDDING_CACHE_MAX_MB", 0)
+    embedded = []
+
+    def counting_embed(texts, **_kwargs):
+        embedded.extend(texts)
+        return [ingest._hash_embedding(text, dim=8) for text in texts]
+
+    monkeypatch.setattr(ingest, "_tei_embed", counting_embed)
+    return fake_qdrant, embedded
+
+
+def _edited_chapters():
+    chapters = _chapters(3, 10)
+    title, html = chapters[2]
+    chapters[2] = (title, html.replace("sentence number 7", "sentence numbr 7"))
+    return chapters
+
+
+def test_reingest_skips_unchanged_chunks(monkeypatch, tmp_path, make_epub):
+    fake_qdrant, embedded = _reingest_setup(monkeypatch, tmp_path)
+    epub_path = make_epub(_chapters(3, 10))
+    book_id = ingest.ingest_epub(str(epub_path))
+    stored = dict(fake_qdrant.points)
+    embedded.clear()
+    upserts_before = fake_qdrant.upsert_calls
+
+    ingest.ingest_epub(str(epub_path))
+
+    assert embedded == []
+    assert fake_qdrant.upsert_calls == upserts_before
+    assert fake_qdrant.deleted == []
+    assert fake_qdrant.points == stored
+    assert db.get_book(book_id)["embedding_dim"] == 8
+
+
+def test_reingest_embeds_only_changed_chunks(monkeypatch, tmp_path, make_epub):
+    fake_qdrant, embedded = _reingest_setup(monkeypatch, tmp_path)
+    book_id = ingest.ingest_epub(str(make_epub(_chapters(3, 10))))
+    before = {
+        point_id: point.payload["content_hash"]
+        for point_id, point in fake_qdrant.points.items()
+    }
+    embedded.clear()
+
+    edited_path = make_epub(_edited_chapters(), name="edited.epub")
+    monkeypatch.setattr(ingest, "get_file_hash", lambda _path: book_id)
+    ingest.ingest_epub(str(edited_path))
+
+    changed = [
+        point_id
+        for point_id, point in fake_qdrant.points.items()
+        if before.get(point_id) != point.payload["content_hash"]
+    ]
+    assert changed
+    assert len(embedded) == len(changed) < len(before)
+    assert all("numbr" in text for text in embedded)
+    assert fake_qdrant.deleted == []
+
+
+def test_reingest_background_cleanup_prunes_stale_points(
+    monkeypatch, tmp_path, make_epub
+):
+    fake_qdrant, embedded = _reingest_setup(monkeypatch, tmp_path)
+    book_id = ingest.ingest_epub(str(make_epub(_chapters(3, 10))))
+    stored_ids = set(fake_qdrant.points)
+    embedded.clear()
+
+    shorter_path = make_epub(_chapters(2, 10), name="shorter.epub")
+    monkeypatch.setattr(ingest, "get_file_hash", lambda _path: book_id)
+    ingest.ingest_epub(str(shorter_path), background_cleanup=True)
+    ingest.shutdown_cleanup_executor()
+
+    assert embedded == []
+    assert fake_qdrant.deleted
+    assert set(fake_qdrant.deleted) == stored_ids - set(fake_qdrant.points)
+    assert all(
+        point.payload["chapter_index"] < 2 for point in fake_qdrant.points.values()
+    )
+
+
+def test_reingest_with_new_model_reembeds_everything(monkeypatch, tmp_path, make_epub):
+    fake_qdrant, embedded = _reingest_setup(monkeypatch, tmp_path)
+    epub_path = make_epub(_chapters(2, 10))
+    ingest.ingest_epub(str(epub_path))
+    first_count = len(embedded)
+    embedded.clear()
+
+    monkeypatch.setattr(ingest, "TEI_MODEL", "other/model")
+    ingest.ingest_epub(str(epub_path))
+
+    assert len(embedded) == first_count
@@ -1,32 +1,32 @@
 import json
-import urllib.error
+import threading
+import time
 
+import httpx
 import pytest
 
 import ingest
 
 
-class _FakeResponse:
-    def __init__(self, payload):
-        self._payload = json.dumps(payload).encode("utf-8")
+def _use_transport(monkeypatch, handler, max_concurrency=None, batch_sizer=None):
+    client = ingest.TEIClient(
+        "http://tei.test",
+        max_concurrency=max_concurrency,
+        transport=httpx.MockTransport(handler),
+        batch_sizer=batch_sizer,
+    )
+    monkeypatch.setattr(ingest, "_get_tei_client", lambda _base_url=None: client)
+    return client
 
-    def read(self):
-        return self._payload
 
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        return False
+def _inputs(request):
+    inputs = json.loads(request.content)["inputs"]
+    return inputs if isinstance(inputs, list) else [inputs]
 
 
 def test_tei_embed_returns_embeddings(monkeypatch):
     payload = [[0.1, 0.2], [0.3, 0.4]]
-
-    def _fake_urlopen(_request, timeout=None):
-        return _FakeResponse(payload)
-
-    monkeypatch.setattr(ingest.urllib.request, "urlopen", _fake_urlopen)
+    _use_transport(monkeypatch, lambda _request: httpx.Response(200, json=payload))
 
     embeddings = ingest._tei_embed(["one", "two"])
 
@@ -35,11 +35,7 @@ def test_tei_embed_returns_embeddings(monkeypatch):
 
 def test_tei_embed_length_mismatch(monkeypatch):
     payload = [[0.1, 0.2]]
-
-    def _fake_urlopen(_request, timeout=None):
-        return _FakeResponse(payload)
-
-    monkeypatch.setattr(ingest.urllib.request, "urlopen", _fake_urlopen)
+    _use_transport(monkeypatch, lambda _request: httpx.Response(200, json=payload))
 
     with pytest.raises(RuntimeError, match="response length mismatch"):
         ingest._tei_embed(["one", "two"])
@@ -48,10 +44,11 @@ def test_tei_embed_length_mismatch(monkeypatch):
 def test_tei_embed_single_input_shape(monkeypatch):
     payload = [0.1, 0.2]
 
-    def _fake_urlopen(_request, timeout=None):
-        return _FakeResponse(payload)
+    def _handler(request):
+        assert json.loads(request.content) == {"inputs": "one"}
+        return httpx.Response(200, json=payload)
 
-    monkeypatch.setattr(ingest.urllib.request, "urlopen", _fake_urlopen)
+    _use_transport(monkeypatch, _handler)
 
     embeddings = ingest._tei_embed(["one"])
 
@@ -59,10 +56,188 @@ def test_tei_embed_single_input_shape(monkeypatch):
 
 
 def test_tei_embed_unavailable(monkeypatch):
-    def _fake_urlopen(_request, timeout=None):
-        raise urllib.error.URLError("no route")
+    def _handler(request):
+        raise httpx.ConnectError("no route", request=request)
 
-    monkeypatch.setattr(ingest.urllib.request, "urlopen", _fake_urlopen)
+    _use_transport(monkeypatch, _handler)
 
     with pytest.raises(RuntimeError, match="TEI embedding service is unavailable"):
         ingest._tei_embed(["one"])
+
+
+def test_tei_embed_http_error(monkeypatch):
+    _use_transport(
+        monkeypatch, lambda _request: httpx.Response(413, text="payload too large")
+    )
+
+    with pytest.raises(
+        RuntimeError, match=r"request failed \(413\): payload too large"
+    ):
+        ingest._tei_embed(["one"])
+
+
+def test_tei_embed_concurrent_batches_keep_input_order(monkeypatch):
+    texts = [f"text {index}" for index in range(10)]
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def _handler(request):
+        nonlocal in_flight, peak
+        batch = _inputs(request)
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        # Earlier batches finish last so completion order differs from input order.
+        time.sleep(0.05 if batch[0] == "text 0" else 0.01)
+        with lock:
+            in_flight -= 1
+        return httpx.Response(200, json=[[float(text.split()[1])] for text in batch])
+
+    _use_transport(monkeypatch, _handler, max_concurrency=3)
+    updates = []
+
+    embeddings = ingest._tei_embed(
+        texts,
+        batch_size=2,
+        progress_callback=lambda *args: updates.append(args),
+    )
+
+    assert embeddings == [[float(index)] for index in range(10)]
+    assert 1 < peak <= 3
+    assert [update[2] for update in updates] == [1, 2, 3, 4, 5]
+    assert updates[-1] == (10, 10, 5, 5)
+    processed = [update[0] for update in updates]
+    assert processed == sorted(processed)
+
+
+def test_tei_client_reuses_cached_instance(monkeypatch):
+    monkeypatch.setattr(ingest, "_TEI_CLIENTS", {})
+
+    first = ingest._get_tei_client("http://tei.test")
+    second = ingest._get_tei_client("http://tei.test")
+    other = ingest._get_tei_client("http://other.test")
+
+    assert first is second
+    assert other is not first
+
+    ingest.shutdown_tei_clients()
+    assert ingest._TEI_CLIENTS == {}
+
+
+def _sizer(initial=4, min_size=1, max_size=16, max_chars=10_000, target=1.0):
+    return ingest.AdaptiveBatchSizer(initial, min_size, max_size, max_chars, target)
+
+
+def _echo_vectors(batch):
+    return httpx.Response(200, json=[[float(len(text))] for text in batch])
+
+
+def test_adaptive_batching_splits_rejected_batches(monkeypatch):
+    texts = [f"text {index}" for index in range(8)]
+    sizes = []
+
+    def _handler(request):
+        batch = _inputs(request)
+        sizes.append(len(batch))
+        if len(batch) > 2:
+            return httpx.Response(413, text="batch too large")
+        return httpx.Response(200, json=[[float(text.split()[1])] for text in batch])
+
+    sizer = _sizer(initial=8)
+    _use_transport(monkeypatch, _handler, max_concurrency=1, batch_sizer=sizer)
+
+    embeddings = ingest._tei_embed(texts)
+
+    assert embeddings == [[float(index)] for index in range(8)]
+    assert sizes[0] == 8
+    # Sizes TEI refused are never attempted again.
+    assert sizer.max_size == 3
+    assert sizer.batch_size <= 3
+
+
+def test_adaptive_batching_splits_timed_out_batches(monkeypatch):
+    def _handler(request):
+        batch = _inputs(request)
+        if len(batch) > 1:
+            raise httpx.ReadTimeout("slow", request=request)
+        return _echo_vectors(batch)
+
+    _use_transport(monkeypatch, _handler, max_concurrency=1, batch_sizer=_sizer())
+
+    assert ingest._tei_embed(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+
+
+def test_adaptive_batching_raises_when_single_text_rejected(monkeypatch):
+    _use_transport(
+        monkeypatch,
+        lambda _request: httpx.Response(413, text="input too large"),
+        batch_sizer=_sizer(),
+    )
+
+    with pytest.raises(RuntimeError, match=r"request failed \(413\)"):
+        ingest._tei_embed(["one", "two"])
+
+
+def test_adaptive_batching_grows_on_fast_batches():
+    sizer = _sizer(initial=4, max_size=8)
+
+    for _ in range(10):
+        sizer.record(sizer.batch_size, 100, 0.1)
+
+    assert sizer.batch_size == 8
+
+
+def test_adaptive_batching_shrinks_on_slow_batches():
+    sizer = _sizer(initial=16, min_size=2)
+
+    sizer.record(16, 4000, 4.0)
+    assert sizer.batch_size == 4
+    assert sizer.char_budget == 4000
+
+    for _ in range(5):
+        sizer.record(sizer.batch_size, 1000, 10.0)
+    assert sizer.batch_size == 2
+
+
+def test_adaptive_batching_caps_characters_per_request(monkeypatch):
+    sizes = []
+
+    def _handler(request):
+        batch = _inputs(request)
+        sizes.append(len(batch))
+        return _echo_vectors(batch)
+
+    sizer = _sizer(initial=16, max_chars=25)
+    _use_transport(monkeypatch, _handler, max_concurrency=1, batch_sizer=sizer)
+    texts = ["x" * 10] * 6 + ["y" * 40]
+
+    embeddings = ingest._tei_embed(texts)
+
+    assert embeddings == [[10.0]] * 6 + [[40.0]]
+    assert sizes == [2, 2, 2, 1]
+
+
+def test_adaptive_batching_validates_bounds():
+    with pytest.raises(ValueError, match="TEI_MAX_BATCH_SIZE"):
+        _sizer(min_size=8, max_size=4)
+
+
+def test_tei_embed_buckets_texts_by_length(monkeypatch):
+    batches = []
+
+    def _handler(request):
+        batch = _inputs(request)
+        batches.append(batch)
+        return _echo_vectors(batch)
+
+    _use_transport(monkeypatch, _handler, max_concurrency=1)
+    texts = ["x" * 40, "x", "x" * 38, "xx", "x" * 39, "xxx"]
+    stats = {}
+
+    embeddings = ingest._tei_embed(texts, batch_size=3, stats=stats)
+
+    assert embeddings == [[float(len(text))] for text in texts]
+    assert batches == [["x", "xx", "xxx"], ["x" * 38, "x" * 39, "x" * 40]]
+    assert stats["tokens_actual"] == 3 + 10 + 10 + 10
+    assert stats["tokens_padded"] == 3 * 1 + 3 * 10